@@ -1,12 +1,19 @@
 """
 Helper CLI
 """
+from pathlib import Path
+from typing import List, Optional
+
 import typer
 from levy.config import Config
 
+from openstats.core.store import store_from_config
+from openstats.core.webhook import replay as replay_events
+from openstats.core.webhook import serve as serve_webhook
 from openstats.theme import write_theme
 
 app = typer.Typer()
+webhook_app = typer.Typer()
 
 
 YAML_FILE = "openstats.yaml"
@@ -23,5 +30,43 @@ def write():
     write_theme(config)
 
 
+def _webhook_config() -> Config:
+    config = Config.read_file(YAML_FILE, list_id="repo")
+
+    if not config("webhook", None):
+        typer.echo(f"Add a webhook section to {YAML_FILE} to enable the store")
+        raise typer.Exit(code=1)
+
+    return config
+
+
+@webhook_app.command()
+def serve(
+    record: Optional[Path] = typer.Option(
+        None, help="Directory where to record the received events"
+    )
+):
+    """
+    Listen to GitHub webhook events and update the store
+    """
+    config = _webhook_config()
+    serve_webhook(config, store_from_config(config), record_dir=record)
+
+
+@webhook_app.command()
+def replay(files: List[Path]):
+    """
+    Apply recorded webhook events to the store
+    """
+    config = _webhook_config()
+    applied = replay_events(
+        store_from_config(config),
+        f"{config.client.owner}/{config.client.repo}",
+        files,
+    )
+
+    typer.echo(f"Applied {applied} out of {len(files)} events")
+
+
 if __name__ == "__main__":
     app()
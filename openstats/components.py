@@ -6,11 +6,21 @@ components to show on the app
 from datetime import datetime
 
 import altair as alt
+import pandas as pd
 import streamlit as st
 from levy.config import Config
+from pandas import DataFrame
 
-from openstats.client import Client
-from openstats.data import Data
+from openstats.core import Client, Data, cache, secrets
+
+
+def use_streamlit():
+    """
+    Plug streamlit memoization and secrets
+    into the headless core
+    """
+    cache.set_backend(st.experimental_memo)
+    secrets.add_source(st.secrets)
 
 
 class Builder:
@@ -21,6 +31,8 @@ class Builder:
     def __init__(self, config: Config):
         self.config = config
 
+        use_streamlit()
+
         self.client = Client(self.config)
         self.data = Data(self.client)
 
@@ -29,6 +41,29 @@ class Builder:
         else:
             self.color = "#7147E8"
 
+    @staticmethod
+    def format_hours(hours: float) -> str:
+        """
+        Show durations in hours or days
+        """
+        if pd.isna(hours):
+            return "-"
+
+        if hours < 48:
+            return f"{hours:.1f} hours"
+
+        return f"{hours / 24:.1f} days"
+
+    def lifecycle_table(self, lifecycle: DataFrame):
+        """
+        Show the time to close and to first response percentiles
+        """
+        table = lifecycle.applymap(self.format_hours)
+        table.index = [f"p{int(percentile * 100)}" for percentile in table.index]
+        table.columns = ["Time to close", "Time to first response"]
+
+        st.table(table)
+
     def stars_component(self):
         """
         Prepare the graph to show the stars evolution
@@ -84,6 +119,8 @@ class Builder:
             open_issues.metric("Open good first issues", len(open_gfi))
             closed_issues.metric("Closed good first issues", len(closed_gfi))
 
+            self.lifecycle_table(self.data.good_first_issues_lifecycle())
+
     def support_issues_component(self):
         """
         Present the good first issues
@@ -97,10 +134,12 @@ class Builder:
             open_issues.metric("Open support issues", len(open_supp))
             closed_issues.metric("Closed support issues", len(closed_supp))
 
-    @staticmethod
-    def clear_cache_button():
+            self.lifecycle_table(self.data.support_issues_lifecycle())
+
+    def clear_cache_button(self):
         """
         Prepare a button to clear the cached API values
+        and expire the data kept in the store
         """
 
         with st.container():
@@ -108,7 +147,8 @@ class Builder:
             st.write("Clear the cache to refresh the data. It may take a few seconds.")
 
             if st.button("Clear cache"):
-                st.experimental_memo.clear()
+                cache.clear()
+                self.data.store.expire()
 
     def contributors_component(self):
         """
@@ -0,0 +1,29 @@
+"""
+Headless core with the client, data and caching layers.
+
+It does not depend on streamlit, so it can be used from
+batch jobs, notebooks or worker processes. Client and Data
+are only imported on first use, as they bring requests
+and pandas along.
+"""
+from typing import Any
+
+from openstats.core import cache, secrets
+
+__all__ = ["Client", "Data", "cache", "secrets"]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "Client":
+        from openstats.core.client import (  # pylint: disable=import-outside-toplevel
+            Client,
+        )
+
+        return Client
+
+    if name == "Data":
+        from openstats.core.data import Data  # pylint: disable=import-outside-toplevel
+
+        return Data
+
+    raise AttributeError(f"module {__name__} has no attribute {name}")
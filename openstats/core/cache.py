@@ -0,0 +1,103 @@
+"""
+Memoization of the API results.
+
+By default, results are kept in memory for the
+lifetime of the process. The streamlit app installs
+st.experimental_memo instead with set_backend.
+"""
+import functools
+import inspect
+import pickle
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class LocalMemo:
+    """
+    In memory memoization with the same semantics as
+    st.experimental_memo: arguments starting with an underscore
+    are not part of the key, and each call gets a fresh copy
+    of the result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: Dict[Tuple[str, bytes], bytes] = {}
+
+    def __call__(self, fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (
+                fn.__qualname__,
+                pickle.dumps(
+                    sorted(
+                        (name, value)
+                        for name, value in bound.arguments.items()
+                        if not name.startswith("_")
+                    )
+                ),
+            )
+
+            with self._lock:
+                result = self._results.get(key)
+
+            if result is None:
+                result = pickle.dumps(fn(*args, **kwargs))
+                with self._lock:
+                    self._results[key] = result
+
+            return pickle.loads(result)
+
+        return wrapper
+
+    def clear(self):
+        """
+        Drop all memoized results
+        """
+        with self._lock:
+            self._results.clear()
+
+
+_backend: Any = LocalMemo()
+_memoized: List[Tuple[Callable, Dict[str, Callable]]] = []
+
+
+def memo(fn: Callable) -> Callable:
+    """
+    Memoize fn with the current backend, following
+    any later change of backend
+    """
+    current = {"fn": _backend(fn)}
+    _memoized.append((fn, current))
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return current["fn"](*args, **kwargs)
+
+    return wrapper
+
+
+def set_backend(backend: Any):
+    """
+    Use a memoization decorator exposing a clear
+    method, such as st.experimental_memo
+    """
+    global _backend  # pylint: disable=global-statement
+
+    if backend is _backend:
+        return
+
+    _backend = backend
+    for fn, current in _memoized:
+        current["fn"] = backend(fn)
+
+
+def clear():
+    """
+    Drop the results memoized by the current backend
+    """
+    _backend.clear()
@@ -0,0 +1,253 @@
+"""
+Module containing helper utilities
+to handle Github API calls
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+from levy.config import Config
+from loguru import logger
+from requests.structures import CaseInsensitiveDict
+
+from openstats.core.cache import memo
+from openstats.core.secrets import get_secret
+from openstats.core.singleflight import SingleFlight
+from openstats.core.tokens import TokenPool, is_rate_limited
+
+# Concurrent sessions asking for the same resource share one request
+single_flight = SingleFlight()
+
+# Seconds to wait for GitHub to connect and to send data
+REQUEST_TIMEOUT = 30
+
+
+def dump_response(res: requests.Response) -> Dict[str, Any]:
+    """
+    Prepare a response to be shared as JSON
+    """
+    return {
+        "url": res.url,
+        "status_code": res.status_code,
+        "headers": dict(res.headers),
+        "text": res.text,
+    }
+
+
+def load_response(data: Dict[str, Any]) -> requests.Response:
+    """
+    Rebuild a response shared as JSON
+    """
+    res = requests.Response()
+    res.url = data["url"]
+    res.status_code = data["status_code"]
+    res.headers = CaseInsensitiveDict(data["headers"])
+    res.encoding = "utf-8"
+    res._content = data["text"].encode("utf-8")
+
+    return res
+
+
+class Client:
+    """
+    Manage API requests to extract data
+    """
+
+    def __init__(self, config: Config):
+
+        self.config = config
+
+        logger.info(f"Preparing client with {self.config.client._vars}")
+
+        self.root = Path(self.config.client.root)
+        self.owner = self.config.client.owner
+        self.repo = self.config.client.repo
+
+        self.full_name = f"{self.owner}/{self.repo}"
+
+        self.tokens = TokenPool.shared(self._get_tokens())
+        self.tokens.add_push_check(self.full_name, self._push_check)
+        self.start_date = datetime.strptime(
+            self.config.client("start_date", "Aug 1 2021"), "%b %d %Y"
+        )
+
+        # The Authorization header is added per request from the token pool
+        self.headers = {
+            "Accept": "application/vnd.github.v3.star+json",
+        }
+
+    @staticmethod
+    def _get_tokens() -> List[str]:
+        """
+        Retrieve the API tokens, either a comma separated
+        API_TOKENS list or a single API_TOKEN
+        """
+        tokens = get_secret("API_TOKENS", "API_TOKEN")
+        if not tokens:
+            raise ValueError("Missing API_TOKEN or API_TOKENS secret")
+
+        if isinstance(tokens, str):
+            tokens = tokens.split(",")
+
+        return [token.strip() for token in tokens if token.strip()]
+
+    def _push_check(self, token: str) -> requests.Response:
+        """
+        Request the repo with the given token, whose permissions
+        tell if it has push access, as required by the traffic endpoints
+        """
+        return requests.get(
+            self.url(self.root / "repos" / self.owner / self.repo),
+            headers={**self.headers, "Authorization": f"token {token}"},
+            timeout=REQUEST_TIMEOUT,
+        )
+
+    def _push_repo(self, push: bool) -> Optional[str]:
+        """
+        Repo the token needs push access to, if any
+        """
+        return self.full_name if push else None
+
+    @staticmethod
+    def url(path: Path) -> str:
+        return "https://" + str(path)
+
+    @staticmethod
+    def _request(
+        url: str,
+        headers: Dict[str, str],
+        tokens: TokenPool,
+        push_repo: Optional[str] = None,
+    ) -> requests.Response:
+        """
+        Send the request with a token from the pool, moving
+        to the next one if it is revoked or exhausted
+        """
+        for _ in range(len(tokens)):
+            token = tokens.acquire(push_repo=push_repo)
+            res = requests.get(
+                url,
+                headers={**headers, "Authorization": f"token {token}"},
+                timeout=REQUEST_TIMEOUT,
+            )
+            tokens.update(token, res)
+
+            if res.status_code != 401 and not is_rate_limited(res):
+                break
+
+        return res
+
+    @staticmethod
+    @memo
+    def _get(
+        path: str,
+        headers: Dict[str, str],
+        _tokens: TokenPool,
+        push_repo: Optional[str],
+    ):
+        return single_flight.do(
+            path,
+            lambda: Client._request(path, headers, _tokens, push_repo=push_repo),
+            encode=dump_response,
+            decode=load_response,
+        )
+
+    def get(self, path: Path, cached: bool = True, push: bool = False):
+        """
+        Prepare a HTTPS URL from the given path.
+
+        Use cached=False to skip the memoized results
+        and push=True for endpoints requiring push access.
+        """
+        if not cached:
+            url = self.url(path)
+            return single_flight.do(
+                url,
+                lambda: self._request(
+                    url, self.headers, self.tokens, push_repo=self._push_repo(push)
+                ),
+                encode=dump_response,
+                decode=load_response,
+            )
+
+        return self._get(
+            self.url(path), self.headers, self.tokens, self._push_repo(push)
+        )
+
+    @staticmethod
+    def _fetch_all(
+        path: str,
+        headers: Dict[str, str],
+        tokens: TokenPool,
+        option: Optional[str] = None,
+        push_repo: Optional[str] = None,
+    ):
+
+        option_str = option if option else ""
+
+        req = path + "?simple=yes&per_page=100&page=1" + option_str
+
+        def fetch():
+            # Each page may be sent with a different token
+            res = Client._request(req, headers, tokens, push_repo=push_repo)
+            data = res.json()
+            while "next" in res.links.keys():
+                res = Client._request(
+                    res.links["next"]["url"], headers, tokens, push_repo=push_repo
+                )
+                page = res.json()
+
+                # Return the error body instead of a partial list
+                if not isinstance(page, list):
+                    return page
+
+                data.extend(page)
+
+            return data
+
+        return single_flight.do(req, fetch)
+
+    @staticmethod
+    @memo
+    def _get_all(
+        path: str,
+        headers: Dict[str, str],
+        _tokens: TokenPool,
+        option: Optional[str] = None,
+        push_repo: Optional[str] = None,
+    ):
+        # Arguments starting with an underscore are not part of the memo key
+        return Client._fetch_all(
+            path, headers, _tokens, option=option, push_repo=push_repo
+        )
+
+    def get_all(
+        self,
+        path: Path,
+        option: Optional[str] = None,
+        cached: bool = True,
+        push: bool = False,
+    ):
+        """
+        Return all pages from a given request.
+
+        Use cached=False to skip the memoized results
+        and push=True for endpoints requiring push access.
+        """
+        if not cached:
+            return self._fetch_all(
+                self.url(path),
+                self.headers,
+                self.tokens,
+                option=option,
+                push_repo=self._push_repo(push),
+            )
+
+        return self._get_all(
+            self.url(path),
+            self.headers,
+            self.tokens,
+            option=option,
+            push_repo=self._push_repo(push),
+        )
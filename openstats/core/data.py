@@ -11,7 +11,10 @@ from dateutil import parser
 from loguru import logger
 from pandas import DataFrame
 
-from openstats.client import Client
+from openstats.core.client import Client
+from openstats.core.store import WEEK_FORMAT, store_from_config
+
+PERCENTILES = [0.5, 0.75, 0.9]
 
 
 class Data:
@@ -25,6 +28,58 @@ class Data:
         # Use client's Levy config
         self.config = self.client.config
 
+        # Local store with the issues synced incrementally. When fed by
+        # webhook events, it also keeps the stars and commits, and polling
+        # the API only reconciles them from time to time.
+        self.store = store_from_config(self.config)
+        self.webhooks = bool(self.config("webhook", None))
+
+        sync_minutes = (
+            self.config.store("sync_minutes", 10) if self.config("store", None) else 10
+        )
+        self.sync_every = timedelta(minutes=float(sync_minutes))
+
+        if self.webhooks:
+            self.reconcile_every = timedelta(
+                hours=float(self.config.webhook("reconcile_hours", 6))
+            )
+
+    def _stargazers(self) -> List[dict]:
+        """
+        Get the stargazers from the store if
+        available or from the API otherwise
+        """
+        path = (
+            self.client.root
+            / "repos"
+            / self.client.owner
+            / self.client.repo
+            / "stargazers"
+        )
+
+        if not self.webhooks:
+            return self.client.get_all(path)
+
+        if not self.store.is_fresh("stars", self.reconcile_every):
+            stargazers = self.client.get_all(path, cached=False)
+            if self._is_list(stargazers, "stargazers"):
+                self.store.reconcile_stars(stargazers)
+
+        return self.store.stargazers()
+
+    @staticmethod
+    def _is_list(response: Any, name: str) -> bool:
+        """
+        Check that the API answered with a list of items and
+        not with an error body, e.g., when rate limited
+        """
+        if isinstance(response, list):
+            return True
+
+        logger.error(f"Error trying to sync {name}, keeping the stored data...")
+        logger.error(response)
+        return False
+
     def stars_data(self) -> Optional[DataFrame]:
         """
         Extract information from stargazers.
@@ -34,13 +89,7 @@ class Data:
         delta = today - self.client.start_date
 
         try:
-            stars = self.client.get_all(
-                self.client.root
-                / "repos"
-                / self.client.owner
-                / self.client.repo
-                / "stargazers"
-            )
+            stars = self._stargazers()
             clean_stars = [
                 parser.parse(user["starred_at"]).strftime("%Y/%m/%d") for user in stars
             ]
@@ -127,6 +176,39 @@ class Data:
 
         return None
 
+    def _sync_issues(self):
+        """
+        Upsert into the store the issues and comments
+        updated since the last sync
+        """
+        path = self.client.root / "repos" / self.client.owner / self.client.repo
+
+        # Each sync is only marked as fresh once its fetch succeeds.
+        # Sorting by updated_at ascending keeps the cursors contiguous.
+        if not self.store.is_fresh("issues", self.sync_every):
+            since = self.store.cursor("issues")
+            issues = self.client.get_all(
+                path / "issues",
+                "&state=all&sort=updated&direction=asc"
+                + (f"&since={since}" if since else ""),
+                cached=False,
+            )
+            if not self._is_list(issues, "issues"):
+                # Comments of issues we failed to store would be lost
+                return
+
+            self.store.sync_issues(issues)
+
+        if not self.store.is_fresh("comments", self.sync_every):
+            since = self.store.cursor("comments")
+            comments = self.client.get_all(
+                path / "issues" / "comments",
+                "&sort=updated&direction=asc" + (f"&since={since}" if since else ""),
+                cached=False,
+            )
+            if self._is_list(comments, "comments"):
+                self.store.sync_comments(comments)
+
     def _issues_data(self, filter_fn: Callable) -> Tuple[List[dict], List[dict]]:
         """
         Return issue data with callable filtering.
@@ -134,24 +216,45 @@ class Data:
         filter_fn should return True / False from a list of issues
         """
 
-        open_issues = self.client.get_all(
-            self.client.root / "repos" / self.client.owner / self.client.repo / "issues"
-        )
+        self._sync_issues()
 
-        open_filtered_issues = [issue for issue in open_issues if filter_fn(issue)]
+        open_filtered_issues = [
+            issue for issue in self.store.issues("open") if filter_fn(issue)
+        ]
+        closed_filtered_issues = [
+            issue for issue in self.store.issues("closed") if filter_fn(issue)
+        ]
 
-        closed_issues = self.client.get_all(
-            self.client.root
-            / "repos"
-            / self.client.owner
-            / self.client.repo
-            / "issues",
-            "&state=closed",
+        return open_filtered_issues, closed_filtered_issues
+
+    def _lifecycle_data(self, filter_fn: Callable) -> DataFrame:
+        """
+        Compute the percentiles of the time to close and
+        the time to first response, in hours, of the issues
+        matching filter_fn
+        """
+        open_issues, closed_issues = self._issues_data(filter_fn)
+        df = pd.DataFrame(
+            open_issues + closed_issues,
+            columns=["created_at", "closed_at", "first_response_at"],
         )
 
-        closed_filtered_issues = [issue for issue in closed_issues if filter_fn(issue)]
+        created_at = pd.to_datetime(df["created_at"], utc=True)
+        closed_at = pd.to_datetime(df["closed_at"], utc=True)
+        first_response_at = pd.to_datetime(df["first_response_at"], utc=True)
 
-        return open_filtered_issues, closed_filtered_issues
+        to_close = closed_at - created_at
+        to_first_response = first_response_at - created_at
+
+        hours = pd.DataFrame(
+            {
+                "time_to_close": to_close.dt.total_seconds() / 3600,
+                "time_to_first_response": to_first_response.dt.total_seconds() / 3600,
+            }
+        )
+
+        # Issues still waiting to be closed or answered are left out
+        return hours.quantile(PERCENTILES)
 
     def good_first_issues_data(self) -> Tuple[List[dict], List[dict]]:
         """
@@ -168,6 +271,22 @@ class Data:
 
         return self._issues_data(filter_fn=self.is_support_issue)
 
+    def good_first_issues_lifecycle(self) -> DataFrame:
+        """
+        Time to close and to first response
+        percentiles of good first issues
+        """
+
+        return self._lifecycle_data(filter_fn=self.is_good_first_issue)
+
+    def support_issues_lifecycle(self) -> DataFrame:
+        """
+        Time to close and to first response
+        percentiles of support issues
+        """
+
+        return self._lifecycle_data(filter_fn=self.is_support_issue)
+
     def contributors_data(self):
         """
         Get all project contributors.
@@ -194,7 +313,9 @@ class Data:
     def traffic_data(self):
         """
         Cook traffic data and views
-        for the last 14 days
+        for the last 14 days.
+
+        Traffic requires a token with push access.
         """
         clones = self.client.get_all(
             self.client.root
@@ -202,7 +323,8 @@ class Data:
             / self.client.owner
             / self.client.repo
             / "traffic"
-            / "clones"
+            / "clones",
+            push=True,
         ).get("uniques")
         views = self.client.get_all(
             self.client.root
@@ -212,6 +334,7 @@ class Data:
             / "traffic"
             / "views",
             option="&per=week",
+            push=True,
         ).get("uniques")
 
         return clones, views
@@ -251,10 +374,6 @@ class Data:
         with its date
         """
 
-        my_activity = {
-            "commits": self.get_participation(self.client.owner, self.client.repo)
-        }
-
         # Today minus days from Sunday
         last_sunday = datetime.today() - timedelta(
             days=datetime.today().isoweekday() % 7
@@ -262,9 +381,41 @@ class Data:
 
         # Prepare dates
         dates = [
-            (last_sunday - timedelta(weeks=1 * i)).strftime("%Y/%m/%d")
+            (last_sunday - timedelta(weeks=1 * i)).strftime(WEEK_FORMAT)
             for i in range(52)
         ]
         dates.reverse()
 
+        if self.webhooks:
+            return pd.DataFrame({"commits": self._stored_commits(dates), "date": dates})
+
+        my_activity = {
+            "commits": self.get_participation(self.client.owner, self.client.repo)
+        }
+
         return pd.DataFrame({**my_activity, "date": dates})
+
+    def _stored_commits(self, dates: List[str]) -> List[int]:
+        """
+        Read the weekly commits from the store, reconciling
+        the counters with the participation stats when needed
+        """
+        if not self.store.is_fresh("commits", self.reconcile_every):
+            participation = self.client.get(
+                self.client.root
+                / "repos"
+                / self.client.owner
+                / self.client.repo
+                / "stats"
+                / "participation",
+                cached=False,
+            ).json()
+
+            # GitHub answers with an empty body while computing the stats
+            if "all" in participation:
+                self.store.reconcile_commits(dict(zip(dates, participation["all"])))
+
+        commits = self.store.commits()
+
+        # Weeks without counters had no pushes since the last reconciliation
+        return [commits.get(date, 0) for date in dates]
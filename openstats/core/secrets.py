@@ -0,0 +1,40 @@
+"""
+Read secrets from the environment or from
+any other registered source, e.g., st.secrets
+"""
+import os
+from typing import Any, List, Mapping
+
+_sources: List[Mapping[str, Any]] = []
+
+
+def add_source(source: Mapping[str, Any]):
+    """
+    Register a fallback source for the secrets
+    not found in the environment variables
+    """
+    if not any(existing is source for existing in _sources):
+        _sources.append(source)
+
+
+def get_secret(*names: str, default: Any = None) -> Any:
+    """
+    Retrieve the first secret found from the given names,
+    looking for all of them in the environment variables
+    before trying the registered sources
+    """
+    for name in names:
+        value = os.environ.get(name)
+        if value:
+            return value
+
+    for source in _sources:
+        for name in names:
+            try:
+                if name in source:
+                    return source[name]
+            except FileNotFoundError:
+                # e.g., st.secrets without a secrets.toml file
+                break
+
+    return default
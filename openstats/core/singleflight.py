@@ -0,0 +1,212 @@
+"""
+Coalesce concurrent calls for the same resource
+into a single upstream fetch
+"""
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows, we only coalesce within the process
+    fcntl = None
+
+# Results are only kept for the followers waiting while they were fetched
+RESULT_MAX_AGE = 60
+LOCK_MAX_AGE = 24 * 60 * 60
+
+# Seconds to wait for the call in flight before fetching on our own
+WAIT_TIMEOUT = 120
+LOCK_POLL_INTERVAL = 0.1
+
+
+def default_lock_dir() -> Path:
+    """
+    Per user folder for the locks and results, unless
+    the OPENSTATS_LOCK_DIR environment variable is set
+    """
+    lock_dir = os.environ.get("OPENSTATS_LOCK_DIR")
+    if lock_dir:
+        return Path(lock_dir)
+
+    return Path(tempfile.gettempdir()) / f"openstats-{os.getuid()}"
+
+
+class _Call:
+    """
+    In flight call that followers wait for
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[Exception] = None
+
+
+class SingleFlight:
+    """
+    Share one execution of a function between all the
+    callers asking for the same key at the same time.
+
+    Within the process, followers wait for the leader thread. Across
+    processes, callers take turns on a file lock and reuse the result
+    written by a leader that finished while they were waiting.
+    """
+
+    def __init__(
+        self, lock_dir: Optional[Path] = None, wait_timeout: float = WAIT_TIMEOUT
+    ):
+        self.lock_dir = Path(lock_dir) if lock_dir else None
+        self.wait_timeout = wait_timeout
+
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        encode: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        Run fn, or wait for the call in flight for the same key.
+
+        Results shared across processes are stored as JSON,
+        use encode and decode for other types.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            logger.debug(f"Waiting for the request in flight for {key}")
+            if not call.done.wait(self.wait_timeout):
+                logger.warning(f"Timed out waiting for {key}, fetching it directly")
+                return fn()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._shared(key, fn, encode, decode)
+            return call.result
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _private_dir(self) -> Optional[Path]:
+        """
+        Prepare the lock folder, making sure that
+        no other user can write in it
+        """
+        lock_dir = self.lock_dir or default_lock_dir()
+        lock_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        info = lock_dir.lstat()
+        if (
+            not stat.S_ISDIR(info.st_mode)
+            or info.st_uid != os.getuid()
+            or info.st_mode & 0o077
+        ):
+            logger.warning(
+                f"{lock_dir} is not a private folder of the current user."
+                " Requests are only coalesced within the process."
+            )
+            return None
+
+        return lock_dir
+
+    @staticmethod
+    def _cleanup(lock_dir: Path):
+        """
+        Remove the results nobody is waiting for anymore
+        and the locks of keys not requested for a long time
+        """
+        now = time.time()
+        for path in lock_dir.iterdir():
+            try:
+                age = now - path.stat().st_mtime
+                if path.suffix == ".json" and age > RESULT_MAX_AGE:
+                    path.unlink()
+                elif path.suffix == ".lock" and age > LOCK_MAX_AGE:
+                    with path.open("a", encoding="utf-8") as lock:
+                        # Skip the locks in use
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        path.unlink()
+            except OSError:
+                continue
+
+    def _shared(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        encode: Optional[Callable[[Any], Any]],
+        decode: Optional[Callable[[Any], Any]],
+    ) -> Any:
+        """
+        Coalesce the call with other processes
+        sharing the same lock_dir
+        """
+        lock_dir = self._private_dir() if fcntl is not None else None
+        if lock_dir is None:
+            return fn()
+
+        self._cleanup(lock_dir)
+
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        result_file = lock_dir / f"{digest}.json"
+
+        started = time.time()
+        with open(lock_dir / f"{digest}.lock", "a", encoding="utf-8") as lock:
+            if not self._acquire(lock):
+                logger.warning(f"Timed out waiting for {key}, fetching it directly")
+                return fn()
+
+            try:
+                # Another process fetched it while we were waiting for the lock
+                if result_file.exists() and result_file.stat().st_mtime >= started:
+                    logger.debug(f"Reusing the request from another process for {key}")
+                    with result_file.open(encoding="utf-8") as file:
+                        result = json.load(file)
+                    return decode(result) if decode else result
+
+                result = fn()
+
+                tmp = result_file.with_name(f"{result_file.name}.{os.getpid()}.tmp")
+                with tmp.open("w", encoding="utf-8") as file:
+                    json.dump(encode(result) if encode else result, file)
+                os.replace(tmp, result_file)
+
+                return result
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _acquire(self, lock) -> bool:
+        """
+        Try to take the file lock until wait_timeout
+        """
+        deadline = time.time() + self.wait_timeout
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.time() >= deadline:
+                    return False
+                time.sleep(LOCK_POLL_INTERVAL)
@@ -0,0 +1,403 @@
+"""
+Local store holding the data that is updated
+incrementally from the API and GitHub webhook events
+"""
+import copy
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from dateutil import parser
+from levy.config import Config
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows, we only lock within the process
+    fcntl = None
+
+WEEK_FORMAT = "%Y/%m/%d"
+DEFAULT_PATH = ".openstats/store.json"
+
+
+def week_start(date: datetime) -> str:
+    """
+    Return the Sunday starting the week of the given date,
+    as the participation API groups commits by week
+    """
+    sunday = date - timedelta(days=date.isoweekday() % 7)
+    return sunday.strftime(WEEK_FORMAT)
+
+
+def slim_issue(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keep only the issue fields we use to compute the KPIs
+    """
+    return {
+        "number": issue["number"],
+        "state": issue.get("state"),
+        "labels": [
+            {"name": label.get("name")}
+            for label in issue.get("labels") or []
+            if isinstance(label, dict)
+        ],
+        "user": {"login": (issue.get("user") or {}).get("login")},
+        "created_at": issue.get("created_at"),
+        "updated_at": issue.get("updated_at"),
+        "closed_at": issue.get("closed_at"),
+        "pull_request": bool(issue.get("pull_request")),
+    }
+
+
+class Store:
+    """
+    JSON file backed store with the star series,
+    the issue index and the weekly commit counters.
+
+    Webhook events are applied as incremental updates, while
+    polling the API only reconciles the whole state from time to time.
+    """
+
+    _stores: Dict[Path, "Store"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._signature: Optional[Tuple[int, int]] = None
+        self.state = self._empty()
+
+        self.load()
+
+    @classmethod
+    def shared(cls, path: Path) -> "Store":
+        """
+        Return the store for the given path, so that all
+        sessions in the process share the same lock
+        """
+        with cls._stores_lock:
+            key = Path(path).resolve()
+            if key not in cls._stores:
+                cls._stores[key] = cls(key)
+
+            return cls._stores[key]
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Hold the store from reading to writing it, both across
+        threads and across processes sharing the file
+        """
+        with self._lock:
+            lock = None
+            if self._depth == 0 and fcntl is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                lock = open(  # pylint: disable=consider-using-with
+                    self.path.with_name(f"{self.path.name}.lock"), "a", encoding="utf-8"
+                )
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            if self._depth == 0:
+                # Always read what other processes wrote before taking the lock
+                self._signature = None
+                self.load()
+
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if lock is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                    lock.close()
+
+    @staticmethod
+    def _empty() -> Dict[str, Any]:
+        return {
+            "stars": {},
+            "issues": {},
+            "commits": {},
+            "synced_at": {},
+            "cursors": {},
+        }
+
+    def load(self):
+        """
+        Read the state from disk if the file changed
+        since we last read or wrote it
+        """
+        with self._lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                return
+
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return
+
+            with self.path.open(encoding="utf-8") as file:
+                self.state = {**self._empty(), **json.load(file)}
+            self._signature = signature
+
+    def save(self):
+        """
+        Atomically write the state, so that readers
+        never see a half written file
+        """
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with tmp.open("w", encoding="utf-8") as file:
+                json.dump(self.state, file)
+            os.replace(tmp, self.path)
+
+            stat = self.path.stat()
+            self._signature = (stat.st_mtime_ns, stat.st_size)
+
+    def is_fresh(self, key: str, max_age: timedelta) -> bool:
+        """
+        Check if the given data has been reconciled
+        against the API within max_age
+        """
+        self.load()
+        synced_at = self.state["synced_at"].get(key)
+        if not synced_at:
+            return False
+
+        return datetime.utcnow() - parser.parse(synced_at) < max_age
+
+    def expire(self):
+        """
+        Mark all the data as outdated, so that
+        the next read syncs it with the API again
+        """
+        with self.transaction():
+            self.state["synced_at"] = {}
+            self.save()
+
+    def _reconcile(self, key: str, value: Dict[str, Any]):
+        with self.transaction():
+            self.state[key] = value
+            self.state["synced_at"][key] = datetime.utcnow().isoformat()
+            self.save()
+
+    def reconcile_stars(self, stargazers: List[Dict[str, Any]]):
+        """
+        Replace the star series from the stargazers endpoint
+        """
+        self._reconcile(
+            "stars",
+            {user["user"]["login"]: user["starred_at"] for user in stargazers},
+        )
+
+    def cursor(self, key: str) -> Optional[str]:
+        """
+        Return the latest updated_at we polled for the given data,
+        to be used as the since= parameter of the next sync
+        """
+        self.load()
+        return self.state["cursors"].get(key)
+
+    def _sync(self, key: str, items: List[Dict[str, Any]], upsert: Callable):
+        with self.transaction():
+            for item in items:
+                if isinstance(item, dict):
+                    upsert(item)
+
+            # Only polling moves the cursors, so that events
+            # missed by the webhook are picked up on the next sync
+            updated = [
+                item["updated_at"]
+                for item in items
+                if isinstance(item, dict) and item.get("updated_at")
+            ]
+            if updated:
+                self.state["cursors"][key] = max(
+                    updated + [self.state["cursors"].get(key, "")]
+                )
+
+            self.state["synced_at"][key] = datetime.utcnow().isoformat()
+            self.save()
+
+    def sync_issues(self, issues: List[Dict[str, Any]]):
+        """
+        Upsert the issues updated since the last sync by their number.
+
+        Deleted or transferred issues are only removed through webhook events.
+        """
+        self._sync("issues", issues, self._upsert_issue)
+
+    def sync_comments(self, comments: List[Dict[str, Any]]):
+        """
+        Record the first response of each issue from
+        the comments updated since the last sync
+        """
+        self._sync("comments", comments, self._add_comment)
+
+    def _upsert_issue(self, issue: Dict[str, Any]):
+        number = str(issue["number"])
+        first_response_at = (
+            self.state["issues"].get(number, {}).get("first_response_at")
+        )
+
+        self.state["issues"][number] = {
+            **slim_issue(issue),
+            "first_response_at": first_response_at,
+        }
+
+    def _add_comment(self, comment: Dict[str, Any]):
+        number = comment["issue_url"].rsplit("/", 1)[-1]
+        issue = self.state["issues"].get(number)
+        user = comment.get("user") or {}
+
+        # Only people other than the author count as a response
+        if (
+            issue is None
+            or user.get("type") == "Bot"
+            or user.get("login") == issue["user"]["login"]
+        ):
+            return
+
+        if (
+            not issue["first_response_at"]
+            or comment["created_at"] < issue["first_response_at"]
+        ):
+            issue["first_response_at"] = comment["created_at"]
+
+    def reconcile_commits(self, weekly_commits: Dict[str, int]):
+        """
+        Replace the commit counters from the participation endpoint
+        """
+        self._reconcile("commits", dict(weekly_commits))
+
+    def stargazers(self) -> List[Dict[str, Any]]:
+        """
+        Return the stargazers with the same shape as the API
+        """
+        with self._lock:
+            self.load()
+            return [
+                {"user": {"login": login}, "starred_at": starred_at}
+                for login, starred_at in self.state["stars"].items()
+            ]
+
+    def issues(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return a copy of the stored issues, optionally filtering by state
+        """
+        with self._lock:
+            self.load()
+            return [
+                copy.deepcopy(issue)
+                for issue in self.state["issues"].values()
+                if state is None or issue["state"] == state
+            ]
+
+    def commits(self) -> Dict[str, int]:
+        """
+        Return the commit counters by week
+        """
+        with self._lock:
+            self.load()
+            return dict(self.state["commits"])
+
+    def apply(self, event: str, payload: Dict[str, Any]) -> bool:
+        """
+        Apply a webhook event as an incremental update.
+
+        Return False if the event is not handled.
+        """
+        handler = getattr(self, f"_on_{event}", None)
+        if handler is None:
+            logger.debug(f"Ignoring webhook event {event}")
+            return False
+
+        with self.transaction():
+            handler(payload)
+            self.save()
+
+        return True
+
+    def _on_star(self, payload: Dict[str, Any]):
+        login = payload["sender"]["login"]
+
+        if payload["action"] == "created":
+            self.state["stars"][login] = payload["starred_at"]
+        elif payload["action"] == "deleted":
+            self.state["stars"].pop(login, None)
+
+    def _on_issues(self, payload: Dict[str, Any]):
+        issue = payload["issue"]
+
+        if payload["action"] in ("deleted", "transferred"):
+            self.state["issues"].pop(str(issue["number"]), None)
+        else:
+            self._upsert_issue(issue)
+
+    def _on_issue_comment(self, payload: Dict[str, Any]):
+        self._upsert_issue(payload["issue"])
+
+        if payload["action"] == "created":
+            self._add_comment(
+                {**payload["comment"], "issue_url": payload["issue"]["url"]}
+            )
+
+    def _on_pull_request(self, payload: Dict[str, Any]):
+        # The issues endpoint also lists pull requests
+        self._upsert_issue({**payload["pull_request"], "pull_request": True})
+
+    def _on_label(self, payload: Dict[str, Any]):
+        name = payload["label"]["name"]
+
+        if payload["action"] == "deleted":
+            for issue in self.state["issues"].values():
+                issue["labels"] = [
+                    label for label in issue["labels"] if label["name"] != name
+                ]
+
+        elif payload["action"] == "edited":
+            old_name = payload.get("changes", {}).get("name", {}).get("from")
+            if old_name:
+                for issue in self.state["issues"].values():
+                    for label in issue["labels"]:
+                        if label["name"] == old_name:
+                            label["name"] = name
+
+    def _on_push(self, payload: Dict[str, Any]):
+        # The participation stats only count the default branch
+        default_branch = payload["repository"]["default_branch"]
+        if payload["ref"] != f"refs/heads/{default_branch}":
+            return
+
+        commits = [
+            commit for commit in payload.get("commits", []) if commit.get("distinct")
+        ]
+        if not commits:
+            return
+
+        head_commit = payload.get("head_commit") or {}
+        pushed_at = (
+            parser.parse(head_commit["timestamp"])
+            if head_commit.get("timestamp")
+            else datetime.utcnow()
+        )
+
+        week = week_start(pushed_at)
+        self.state["commits"][week] = self.state["commits"].get(week, 0) + len(commits)
+
+
+def store_from_config(config: Config) -> Store:
+    """
+    Prepare the Store from the optional store config
+    """
+    if config("store", None):
+        return Store.shared(Path(config.store("path", DEFAULT_PATH)))
+
+    return Store.shared(Path(DEFAULT_PATH))
@@ -0,0 +1,205 @@
+"""
+Pool of API tokens balancing the requests
+by their remaining rate limit quota
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from loguru import logger
+
+# Quota of an authenticated token before we read its headers
+DEFAULT_QUOTA = 5000
+
+# Seconds to hold back a rate limited token when GitHub does not say
+MIN_BACKOFF = 60
+
+
+class Token:
+    """
+    API token with its last known quota
+    """
+
+    def __init__(self, value: str):
+        self.value = value
+
+        self.remaining = DEFAULT_QUOTA
+        self.reset = 0.0
+        self.revoked = False
+
+        # Push access by owner/repo
+        self.push: Dict[str, bool] = {}
+
+    def is_available(self) -> bool:
+        """
+        Check if the token can still be used
+        """
+        if self.revoked:
+            return False
+
+        if self.remaining <= 0 and time.time() >= self.reset:
+            # The rate limit window is over
+            self.remaining = DEFAULT_QUOTA
+
+        return self.remaining > 0
+
+
+class TokenPool:
+    """
+    Distribute the requests across tokens, always picking
+    the one with the most remaining quota.
+
+    Exhausted tokens come back once their rate limit resets,
+    while revoked tokens are taken out of rotation for good.
+    """
+
+    _pools: Dict[Tuple[str, ...], "TokenPool"] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = [Token(value) for value in tokens]
+
+        self._lock = threading.Lock()
+        self._push_checks: Dict[str, Callable[[str], requests.Response]] = {}
+        self._pinned: Dict[str, Token] = {}
+
+    @classmethod
+    def shared(cls, tokens: List[str]) -> "TokenPool":
+        """
+        Return the pool for the given tokens, so that all
+        sessions in the process share the quota tracking
+        """
+        with cls._pools_lock:
+            key = tuple(tokens)
+            if key not in cls._pools:
+                cls._pools[key] = cls(tokens)
+
+            return cls._pools[key]
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def add_push_check(self, repo: str, check: Callable[[str], requests.Response]):
+        """
+        Register how to request the owner/repo with a token,
+        whose permissions tell if it has push access
+        """
+        with self._lock:
+            self._push_checks.setdefault(repo, check)
+
+    def _check_push(self, repo: str):
+        """
+        Look for a token with push access to the repo, if the pinned
+        one is not available. The requests are sent without holding
+        the lock, and their quota is tracked as any other request.
+        """
+        with self._lock:
+            pinned = self._pinned.get(repo)
+            if pinned is not None and pinned.is_available():
+                return
+
+            check = self._push_checks[repo]
+            unchecked = [
+                token
+                for token in self.tokens
+                if repo not in token.push and token.is_available()
+            ]
+
+        for token in unchecked:
+            res = check(token.value)
+            self.update(token.value, res)
+
+            if res.ok:
+                push = bool(res.json().get("permissions", {}).get("push"))
+                token.push[repo] = push
+                if push:
+                    return
+
+    def acquire(self, push_repo: Optional[str] = None) -> str:
+        """
+        Pick the token for the next request.
+
+        If push_repo is given, stay pinned to a token with push
+        access to that owner/repo, as required by the traffic endpoints.
+        """
+        if push_repo:
+            self._check_push(push_repo)
+
+        with self._lock:
+            available = [token for token in self.tokens if token.is_available()]
+
+            if push_repo:
+                token = self._pinned.get(push_repo)
+                if token not in available:
+                    token = next(
+                        iter(tok for tok in available if tok.push.get(push_repo)),
+                        None,
+                    )
+                    if token is not None:
+                        self._pinned[push_repo] = token
+            else:
+                token = max(available, key=lambda tok: tok.remaining, default=None)
+
+            if token is None:
+                logger.error("There are no API tokens available. Trying any of them.")
+                token = min(self.tokens, key=lambda tok: (tok.revoked, tok.reset))
+
+            # Count the request in flight before reading its headers,
+            # so that concurrent requests spread across tokens
+            token.remaining -= 1
+
+            return token.value
+
+    def update(self, value: str, response: requests.Response):
+        """
+        Track the quota of the token from the response headers
+        """
+        with self._lock:
+            token = next(iter(tok for tok in self.tokens if tok.value == value))
+
+            if response.status_code == 401:
+                logger.warning(f"Removing revoked token ending in {value[-4:]}")
+                token.revoked = True
+                return
+
+            remaining = response.headers.get("X-RateLimit-Remaining")
+            if remaining is not None:
+                token.remaining = int(remaining)
+
+            reset = response.headers.get("X-RateLimit-Reset")
+            if reset is not None:
+                token.reset = float(reset)
+
+            if is_rate_limited(response):
+                # Secondary rate limits may tell how long to wait
+                retry_after = response.headers.get("Retry-After")
+                if retry_after is not None:
+                    token.reset = time.time() + float(retry_after)
+                else:
+                    token.reset = max(token.reset, time.time() + MIN_BACKOFF)
+
+                logger.warning(
+                    f"Token ending in {value[-4:]} is exhausted"
+                    f" until {time.ctime(token.reset)}"
+                )
+                token.remaining = 0
+
+
+def is_rate_limited(response: requests.Response) -> bool:
+    """
+    Check if the response failed due to the primary
+    or the secondary rate limits
+    """
+    if response.status_code == 429:
+        return True
+
+    if response.status_code != 403:
+        return False
+
+    # Secondary rate limits may only be told in the message
+    return (
+        response.headers.get("X-RateLimit-Remaining") == "0"
+        or "Retry-After" in response.headers
+        or "rate limit" in response.text.lower()
+    )
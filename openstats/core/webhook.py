@@ -0,0 +1,178 @@
+"""
+Small HTTP receiver for GitHub webhook events
+that keeps the local Store up to date
+"""
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from levy.config import Config
+from loguru import logger
+
+from openstats.core.secrets import get_secret
+from openstats.core.store import Store
+
+EVENTS = ("star", "issues", "issue_comment", "label", "push", "pull_request")
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """
+    Validate the X-Hub-Signature-256 header
+    against the HMAC digest of the body
+    """
+    if not signature or not signature.startswith("sha256="):
+        return False
+
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(f"sha256={digest}", signature)
+
+
+def apply_event(
+    store: Store, full_name: str, event: str, payload: Dict[str, Any]
+) -> bool:
+    """
+    Apply the event to the store if it belongs to our repository.
+
+    Competitors are not tracked through webhooks.
+    """
+    if event not in EVENTS:
+        return False
+
+    repository = payload.get("repository") or {}
+    if repository.get("full_name", "").lower() != full_name.lower():
+        logger.debug(f"Ignoring {event} event from {repository.get('full_name')}")
+        return False
+
+    return store.apply(event, payload)
+
+
+def replay(store: Store, full_name: str, files: Iterable[Path]) -> int:
+    """
+    Apply recorded events to the store.
+
+    Each file is a JSON with the `event` name and its `payload`.
+    Return the number of applied events.
+    """
+    applied = 0
+    for file in sorted(files):
+        with Path(file).open(encoding="utf-8") as recorded:
+            delivery = json.load(recorded)
+
+        if apply_event(store, full_name, delivery["event"], delivery["payload"]):
+            applied += 1
+
+    return applied
+
+
+class WebhookServer(HTTPServer):
+    """
+    HTTPServer holding the state shared by the handlers
+    """
+
+    def __init__(
+        self,
+        address,
+        store: Store,
+        full_name: str,
+        secret: str,
+        record_dir: Optional[Path] = None,
+    ):
+        super().__init__(address, WebhookHandler)
+
+        self.store = store
+        self.full_name = full_name
+        self.secret = secret
+        self.record_dir = record_dir
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """
+    Validate and apply each delivery
+    """
+
+    server: WebhookServer
+
+    def _reply(self, status: int, message: str = ""):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.end_headers()
+        self.wfile.write(message.encode("utf-8"))
+
+    def _record(self, event: str, payload: Dict[str, Any]):
+        delivery = self.headers.get("X-GitHub-Delivery", "unknown")
+        received_at = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+        file_name = f"{received_at}_{event}_{delivery}.json"
+
+        self.server.record_dir.mkdir(parents=True, exist_ok=True)
+        with (self.server.record_dir / file_name).open("w", encoding="utf-8") as file:
+            json.dump({"event": event, "payload": payload}, file)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Handle a webhook delivery
+        """
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if not verify_signature(
+            self.server.secret, body, self.headers.get("X-Hub-Signature-256")
+        ):
+            logger.warning("Received webhook delivery with an invalid signature")
+            self._reply(401, "Invalid signature")
+            return
+
+        event = self.headers.get("X-GitHub-Event", "")
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._reply(400, "Invalid payload")
+            return
+
+        if self.server.record_dir:
+            self._record(event, payload)
+
+        try:
+            applied = apply_event(
+                self.server.store, self.server.full_name, event, payload
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error(f"Error applying {event} event...")
+            logger.error(err)
+            self._reply(500, "Error applying event")
+            return
+
+        self._reply(202 if applied else 200, "Applied" if applied else "Ignored")
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug(format % args)
+
+
+def serve(config: Config, store: Store, record_dir: Optional[Path] = None):
+    """
+    Start the webhook receiver with the host
+    and port from the config
+    """
+    secret = get_secret("WEBHOOK_SECRET")
+    if not secret:
+        raise ValueError("Missing WEBHOOK_SECRET secret")
+
+    host = config.webhook("host", "0.0.0.0")
+    port = int(config.webhook("port", 8080))
+
+    server = WebhookServer(
+        (host, port),
+        store=store,
+        full_name=f"{config.client.owner}/{config.client.repo}",
+        secret=secret,
+        record_dir=record_dir,
+    )
+
+    logger.info(f"Listening to webhook events on {host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,175 @@
+"""
+Incremental issue sync of the store
+"""
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from levy.config import Config
+
+from openstats.core.data import Data
+from openstats.core.store import Store
+
+FRESH = timedelta(minutes=10)
+
+
+def issue(number, updated_at, state="open", login="carol"):
+    return {
+        "url": f"https://api.github.com/repos/pmbrull/OpenStats/issues/{number}",
+        "number": number,
+        "state": state,
+        "labels": [{"name": "support"}],
+        "user": {"login": login},
+        "created_at": "2022-02-01T00:00:00Z",
+        "updated_at": updated_at,
+        "closed_at": updated_at if state == "closed" else None,
+    }
+
+
+def comment(number, created_at, login="pmbrull", user_type="User"):
+    return {
+        "issue_url": f"https://api.github.com/repos/pmbrull/OpenStats/issues/{number}",
+        "user": {"login": login, "type": user_type},
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return Store(tmp_path / "store.json")
+
+
+def test_sync_issues_upserts_and_moves_cursor(store):
+    assert store.cursor("issues") is None
+    assert not store.is_fresh("issues", FRESH)
+
+    store.sync_issues(
+        [issue(1, "2022-02-02T00:00:00Z"), issue(2, "2022-02-03T00:00:00Z")]
+    )
+    store.sync_issues([issue(1, "2022-02-04T00:00:00Z", state="closed")])
+
+    assert store.cursor("issues") == "2022-02-04T00:00:00Z"
+    assert store.is_fresh("issues", FRESH)
+    assert [i["number"] for i in store.issues("open")] == [2]
+    assert [i["number"] for i in store.issues("closed")] == [1]
+
+
+def test_sync_never_moves_cursor_back(store):
+    store.sync_issues([issue(1, "2022-02-04T00:00:00Z")])
+    store.sync_issues([issue(2, "2022-02-03T00:00:00Z")])
+    store.sync_issues([])
+
+    assert store.cursor("issues") == "2022-02-04T00:00:00Z"
+
+
+def test_sync_comments_first_response(store):
+    store.sync_issues([issue(1, "2022-02-02T00:00:00Z")])
+    store.sync_comments(
+        [
+            # Neither the author nor bots count as a response
+            comment(1, "2022-02-01T01:00:00Z", login="carol"),
+            comment(1, "2022-02-01T02:00:00Z", login="github-actions", user_type="Bot"),
+            comment(1, "2022-02-01T05:00:00Z"),
+            comment(1, "2022-02-01T03:00:00Z", login="bob"),
+        ]
+    )
+
+    assert store.issues()[0]["first_response_at"] == "2022-02-01T03:00:00Z"
+    assert store.cursor("comments") == "2022-02-01T05:00:00Z"
+
+    # Upserting the issue keeps its first response
+    store.sync_issues([issue(1, "2022-02-06T00:00:00Z")])
+    assert store.issues()[0]["first_response_at"] == "2022-02-01T03:00:00Z"
+
+
+def test_issues_are_copies(store):
+    store.sync_issues([issue(1, "2022-02-02T00:00:00Z")])
+    store.issues()[0]["state"] = "closed"
+
+    assert store.issues()[0]["state"] == "open"
+
+
+def test_expire(store):
+    store.sync_issues([issue(1, "2022-02-02T00:00:00Z")])
+    store.expire()
+
+    assert not store.is_fresh("issues", FRESH)
+    assert store.cursor("issues") == "2022-02-02T00:00:00Z"
+
+
+class FakeClient:
+    """
+    Client answering the paginated requests from a list
+    """
+
+    def __init__(self, config: Config, responses):
+        self.config = config
+        self.root = Path("api.github.com")
+        self.owner = "pmbrull"
+        self.repo = "OpenStats"
+
+        self.responses = list(responses)
+        self.requests = []
+
+    def get_all(self, path, option=None, cached=True, push=False):
+        self.requests.append((str(path), option))
+        return self.responses.pop(0)
+
+
+def make_data(tmp_path, responses) -> Data:
+    config = Config.read_dict(
+        {
+            "title": "OpenStats",
+            "client": {
+                "root": "api.github.com",
+                "owner": "pmbrull",
+                "repo": "OpenStats",
+            },
+            "store": {"path": str(tmp_path / "store.json")},
+        },
+        list_id="repo",
+    )
+    return Data(FakeClient(config, responses))
+
+
+def test_data_sync_requests_since_cursor(tmp_path):
+    data = make_data(
+        tmp_path,
+        [
+            [issue(1, "2022-02-02T00:00:00Z")],
+            [comment(1, "2022-02-01T03:00:00Z")],
+        ],
+    )
+
+    open_issues, closed_issues = data.support_issues_data()
+
+    assert [i["number"] for i in open_issues] == [1]
+    assert closed_issues == []
+    assert open_issues[0]["first_response_at"] == "2022-02-01T03:00:00Z"
+
+    # Later syncs only ask for what changed, in updated_at order
+    data.store.expire()
+    data.client.responses = [[], []]
+    data.support_issues_data()
+
+    assert data.client.requests[-2][1] == (
+        "&state=all&sort=updated&direction=asc&since=2022-02-02T00:00:00Z"
+    )
+    assert data.client.requests[-1][1] == (
+        "&sort=updated&direction=asc&since=2022-02-01T03:00:00Z"
+    )
+
+
+def test_data_sync_error_is_not_fresh(tmp_path):
+    data = make_data(
+        tmp_path, [{"message": "API rate limit exceeded", "documentation_url": "..."}]
+    )
+
+    assert data.good_first_issues_data() == ([], [])
+
+    # The comments are not synced without their issues
+    assert len(data.client.requests) == 1
+    assert not data.store.is_fresh("issues", FRESH)
+    assert not data.store.is_fresh("comments", FRESH)
+    assert data.store.cursor("issues") is None
@@ -0,0 +1,102 @@
+"""
+Rotation and revocation of the API tokens
+"""
+import json
+import time
+
+import requests
+
+from openstats.core.tokens import MIN_BACKOFF, TokenPool, is_rate_limited
+
+
+def response(status_code=200, headers=None, body=None) -> requests.Response:
+    res = requests.Response()
+    res.status_code = status_code
+    res.headers.update(headers or {})
+    res._content = json.dumps(body if body is not None else {}).encode()
+    return res
+
+
+def quota(remaining, reset=0):
+    return {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(reset)}
+
+
+def test_rotation_by_remaining_quota():
+    pool = TokenPool(["aaaa", "bbbb"])
+    pool.update("aaaa", response(headers=quota(100)))
+    pool.update("bbbb", response(headers=quota(4000)))
+
+    assert pool.acquire() == "bbbb"
+
+    pool.update("bbbb", response(headers=quota(10)))
+    assert pool.acquire() == "aaaa"
+
+
+def test_revoked_token_is_removed():
+    pool = TokenPool(["aaaa", "bbbb"])
+    pool.update("bbbb", response(401, body={"message": "Bad credentials"}))
+
+    assert [pool.acquire() for _ in range(3)] == ["aaaa"] * 3
+
+
+def test_exhausted_token_comes_back_after_reset():
+    pool = TokenPool(["aaaa", "bbbb"])
+    pool.update("aaaa", response(headers=quota(4000)))
+    pool.update("bbbb", response(403, headers=quota(0, time.time() + 3600)))
+
+    assert pool.tokens[1].reset > time.time() + 3500
+    assert {pool.acquire() for _ in range(3)} == {"aaaa"}
+
+    pool.tokens[1].reset = time.time() - 1
+    assert pool.acquire() == "bbbb"
+
+
+def test_secondary_rate_limit_backs_off():
+    message = {"message": "You have exceeded a secondary rate limit."}
+    assert is_rate_limited(response(403, body=message))
+    assert is_rate_limited(response(429))
+    assert not is_rate_limited(response(403, body={"message": "Forbidden"}))
+
+    pool = TokenPool(["aaaa", "bbbb"])
+    pool.update("aaaa", response(403, headers=quota(4000), body=message))
+    pool.update("bbbb", response(429))
+
+    for token in pool.tokens:
+        assert token.remaining == 0
+        assert token.reset >= time.time() + MIN_BACKOFF - 1
+
+
+def test_retry_after():
+    pool = TokenPool(["aaaa"])
+    pool.update("aaaa", response(403, headers={"Retry-After": "600"}))
+
+    assert time.time() + 590 < pool.tokens[0].reset <= time.time() + 600
+
+
+def test_push_is_tracked_by_repo():
+    pool = TokenPool(["aaaa", "bbbb"])
+    checked = []
+
+    def check(push_tokens):
+        def _check(token):
+            checked.append(token)
+            return response(body={"permissions": {"push": token in push_tokens}})
+
+        return _check
+
+    pool.add_push_check("pmbrull/OpenStats", check({"bbbb"}))
+    pool.add_push_check("pmbrull/levy", check({"aaaa"}))
+
+    assert pool.acquire("pmbrull/OpenStats") == "bbbb"
+    assert pool.acquire("pmbrull/levy") == "aaaa"
+
+    # Pinned tokens are not checked again
+    checked.clear()
+    assert pool.acquire("pmbrull/OpenStats") == "bbbb"
+    assert pool.acquire("pmbrull/levy") == "aaaa"
+    assert checked == []
+
+
+def test_shared_pool():
+    assert TokenPool.shared(["aaaa", "bbbb"]) is TokenPool.shared(["aaaa", "bbbb"])
+    assert TokenPool.shared(["aaaa"]) is not TokenPool.shared(["aaaa", "bbbb"])
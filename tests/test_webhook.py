@@ -0,0 +1,148 @@
+"""
+Replay recorded webhook deliveries into a local store
+"""
+import hashlib
+import hmac
+import json
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from openstats.core.store import Store
+from openstats.core.webhook import WebhookServer, apply_event, replay, verify_signature
+
+EVENTS = Path(__file__).parent / "events"
+FULL_NAME = "pmbrull/OpenStats"
+SECRET = "It's a Secret to Everybody"
+
+
+def sign(body: bytes) -> str:
+    return "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def load_event(name: str):
+    with (EVENTS / f"{name}.json").open(encoding="utf-8") as file:
+        delivery = json.load(file)
+
+    return delivery["event"], delivery["payload"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return Store(tmp_path / "store.json")
+
+
+def test_verify_signature():
+    body = b'{"zen": "Keep it logically awesome."}'
+
+    assert verify_signature(SECRET, body, sign(body))
+    assert not verify_signature(SECRET, body + b" ", sign(body))
+    assert not verify_signature("another secret", body, sign(body))
+    assert not verify_signature(SECRET, body, None)
+    assert not verify_signature(SECRET, body, sign(body).replace("sha256", "sha1"))
+
+
+def test_replay(store):
+    applied = replay(store, FULL_NAME, EVENTS.glob("*.json"))
+
+    # Events from other repositories and pings are ignored
+    assert applied == 12
+
+    assert store.stargazers() == [
+        {"user": {"login": "bob"}, "starred_at": "2022-02-02T11:00:00Z"}
+    ]
+
+    issues = {issue["number"]: issue for issue in store.issues()}
+    assert set(issues) == {1, 2, 3}
+
+    assert issues[1]["state"] == "closed"
+    assert issues[1]["labels"] == [{"name": "question"}]
+    assert issues[1]["closed_at"] == "2022-02-04T09:00:00Z"
+    assert issues[1]["first_response_at"] == "2022-02-03T12:00:00Z"
+
+    assert issues[2]["labels"] == []
+    assert issues[3]["pull_request"]
+    assert [issue["number"] for issue in store.issues("open")] == [2, 3]
+
+    # Only distinct commits to the default branch, by week starting on Sunday
+    assert store.commits() == {"2022/02/06": 2}
+
+
+def test_replay_persists(store, tmp_path):
+    replay(store, FULL_NAME, EVENTS.glob("*.json"))
+
+    reloaded = Store(tmp_path / "store.json")
+    assert reloaded.state == store.state
+
+
+def test_apply_event_filters_repository(store):
+    event, payload = load_event("13_star_created_other_repo")
+
+    assert not apply_event(store, FULL_NAME, event, payload)
+    assert apply_event(store, "pmbrull/levy", event, payload)
+    assert store.stargazers() == [
+        {"user": {"login": "erin"}, "starred_at": "2022-02-09T10:00:00Z"}
+    ]
+
+
+def test_issue_comment_by_author_is_not_a_response(store):
+    event, payload = load_event("05_issue_comment_created")
+    payload["comment"]["user"]["login"] = payload["issue"]["user"]["login"]
+
+    apply_event(store, FULL_NAME, event, payload)
+
+    assert store.issues()[0]["first_response_at"] is None
+
+
+def test_server(store, tmp_path):
+    server = WebhookServer(
+        ("127.0.0.1", 0),
+        store=store,
+        full_name=FULL_NAME,
+        secret=SECRET,
+        record_dir=tmp_path / "recorded",
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def post(event: str, body: bytes, signature: str) -> int:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}",
+            data=body,
+            headers={
+                "X-GitHub-Event": event,
+                "X-GitHub-Delivery": "72d3162e",
+                "X-Hub-Signature-256": signature,
+            },
+        )
+        try:
+            with urllib.request.urlopen(request) as res:
+                return res.status
+        except urllib.error.HTTPError as err:
+            return err.code
+
+    try:
+        event, payload = load_event("01_star_created")
+        body = json.dumps(payload).encode()
+
+        assert post(event, body, "sha256=invalid") == 401
+        assert store.stargazers() == []
+
+        assert post(event, body, sign(body)) == 202
+        assert store.stargazers() == [
+            {"user": {"login": "alice"}, "starred_at": "2022-02-01T10:00:00Z"}
+        ]
+
+        ping = b'{"zen": "Keep it logically awesome."}'
+        assert post("ping", ping, sign(ping)) == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # The recorded deliveries can be replayed into another store
+    recorded = Store(tmp_path / "replayed.json")
+    assert replay(recorded, FULL_NAME, (tmp_path / "recorded").glob("*.json")) == 1
+    assert recorded.stargazers() == store.stargazers()